@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2011 Michael Walle
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Transfer files (screenshots, setups, waveforms) from and to a device.
+
+usage: file-transfer.py [options] get <host> <command> <file>
+       file-transfer.py [options] put <host> <command> <file>
+
+For 'get', <command> is sent to the device and its response is stored in
+<file>. If the response is a definite length block, only its payload is
+stored. For 'put', the contents of <file> are appended as a definite length
+block to <command>, eg. 'MMEM:DATA "setup.set",'.
+"""
+
+import sys
+import logging
+from optparse import OptionParser
+
+import pyvxi11
+
+def progress(nbytes, elapsed):
+    if elapsed > 0:
+        rate = nbytes / elapsed / 1000
+    else:
+        rate = 0
+    sys.stderr.write('\r%d bytes, %.1f kB/s' % (nbytes, rate))
+
+def main():
+    parser = OptionParser(usage=__doc__.strip())
+    parser.add_option('-d', action='store_true', dest='debug',
+            help='enable debug messages')
+    parser.add_option('-q', action='store_true', dest='quiet',
+            help='do not show the progress')
+    parser.add_option('-w', action='store_true', dest='wait',
+            help='wait for pending operations (*OPC?) before the transfer')
+    parser.add_option('-t', type='float', dest='timeout', default=10,
+            help='io timeout in seconds (default: %default)')
+
+    (options, args) = parser.parse_args()
+
+    logging.basicConfig()
+    if options.debug:
+        logging.getLogger('pyvxi11').setLevel(logging.DEBUG)
+
+    if len(args) != 4 or args[0] not in ('get', 'put'):
+        print parser.format_help()
+        sys.exit(1)
+
+    (direction, host, command, filename) = args
+
+    if options.quiet:
+        report = None
+    else:
+        report = progress
+
+    v = pyvxi11.Vxi11(host)
+    v.open()
+    if options.wait:
+        v.wait_complete(options.timeout)
+    if direction == 'get':
+        with open(filename, 'wb') as f:
+            stats = v.fetch_file(command, f, report, options.timeout)
+    else:
+        with open(filename, 'rb') as f:
+            stats = v.send_file(command, f, progress=report,
+                    io_timeout=options.timeout)
+    v.close()
+
+    if not options.quiet:
+        sys.stderr.write('\n')
+    print stats
+
+if __name__ == '__main__':
+    main()
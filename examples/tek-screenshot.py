@@ -21,13 +21,12 @@ usage: tek-screenshot.py <host> <file.png>
 
 import pyvxi11
 import sys
-import time
 
 if len(sys.argv) != 3:
     print __doc__
     sys.exit(1)
 
-f = file(sys.argv[2], 'w')
+f = open(sys.argv[2], 'wb')
 v = pyvxi11.Vxi11(sys.argv[1])
 v.open()
 v.write(r'EXPORT:FILENAME "C:\TEMP\SCREEN.PNG"')
@@ -38,8 +37,9 @@ v.write('EXPORT:VIEW FULLSCREEN')
 #v.write('EXPORT:VIEW GRATICULE')
 #v.write('EXPORT:VIEW FULLNO')
 v.write('EXPORT START')
-v.write(r'FILESYSTEM:PRINT "C:\TEMP\SCREEN.PNG", GPIB')
-time.sleep(0.5)
-f.write(v.read())
+v.wait_complete(io_timeout=10)
+stats = v.fetch_file(r'FILESYSTEM:PRINT "C:\TEMP\SCREEN.PNG", GPIB', f)
+f.close()
+print stats
 v.write(r'FILESYSTEM:DELETE "C:\TEMP\SCREEN.PNG"')
-
+v.close()
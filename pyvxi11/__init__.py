@@ -3,4 +3,6 @@ try:
 except ImportError:
     __version__ = 'dev'
 
-from vxi11 import Vxi11, Vxi11Error
+from vxi11 import Vxi11, Vxi11Error, compare_transports
+from rpc import TransportOptions
+from pool import acquire_sharded
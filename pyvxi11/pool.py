@@ -0,0 +1,219 @@
+#
+# Multi-process acquisition from several VXI-11 devices
+# Copyright (c) 2011 Michael Walle
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import mmap
+import multiprocessing
+import os
+import tempfile
+
+from vxi11 import Vxi11, byte_view, view_bytes
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+log = logging.getLogger(__name__)
+
+# Shared blocks are files in a RAM backed filesystem, if there is one.
+if os.path.isdir('/dev/shm'):
+    SHM_DIR = '/dev/shm'
+else:
+    SHM_DIR = None
+
+# the samples are copied to the shared blocks in slices of this size
+COPY_SIZE = 1024*1024
+
+
+class SharedBlock(object):
+    """A block of memory, which can be mapped by several processes.
+
+    If no name is given, a new block of `size` bytes is created. Otherwise
+    the existing block `name` is mapped.
+    """
+    def __init__(self, size, name=None):
+        if name is None:
+            fd, name = tempfile.mkstemp(prefix='pyvxi11-', dir=SHM_DIR)
+            # an empty mapping is not possible
+            os.ftruncate(fd, max(size, 1))
+        else:
+            fd = os.open(name, os.O_RDWR)
+        self.name = name
+        self.size = size
+        try:
+            self.mmap = mmap.mmap(fd, max(size, 1))
+        finally:
+            os.close(fd)
+
+    def unlink(self):
+        os.unlink(self.name)
+
+
+def group_by_host(host, kwargs):
+    """Run all links to one host in the same worker."""
+    return host
+
+
+def group_by_link(host, kwargs):
+    """Run every link in its own worker."""
+    return (host, _link_key(kwargs))
+
+
+def _link_key(kwargs):
+    return tuple(sorted(kwargs.items()))
+
+
+def _make_jobs(tasks, group, kwargs):
+    # Returns one (links, steps, indices) tuple per worker. links are the
+    # (host, link_kwargs) of the links to open, steps the (link number,
+    # acquire) pairs to run and indices their positions in `tasks`.
+    keys = list()
+    jobs = dict()
+    for (n, task) in enumerate(tasks):
+        host, acquire = task[:2]
+        link_kwargs = dict(kwargs)
+        if len(task) > 2:
+            link_kwargs.update(task[2])
+        key = group(host, link_kwargs)
+        if key not in jobs:
+            keys.append(key)
+            jobs[key] = (list(), list(), list(), dict())
+        links, steps, indices, link_index = jobs[key]
+        link_key = (host, _link_key(link_kwargs))
+        if link_key not in link_index:
+            link_index[link_key] = len(links)
+            links.append((host, link_kwargs))
+        steps.append((link_index[link_key], acquire))
+        indices.append(n)
+    return [jobs[key][:3] for key in keys]
+
+
+def _acquire_group(job):
+    # Runs in the worker process. Returns the metadata of the shared
+    # blocks, the samples itself are never pickled.
+    links, steps = job
+    devices = list()
+    metas = list()
+    try:
+        for (host, kwargs) in links:
+            v = Vxi11(host, **kwargs)
+            v.open()
+            devices.append(v)
+        for (n, acquire) in steps:
+            data = acquire(devices[n])
+            dtype = shape = None
+            if numpy is not None and isinstance(data, numpy.ndarray):
+                if data.dtype.hasobject:
+                    raise TypeError('arrays of python objects can not be '
+                            'shared')
+                data = numpy.ascontiguousarray(data)
+                dtype = data.dtype.str
+                shape = data.shape
+            view = byte_view(data)
+            block = SharedBlock(len(view))
+            metas.append((block.name, block.size, dtype, shape))
+            # mmap only takes strings and old style buffers
+            for i in xrange(0, len(view), COPY_SIZE):
+                block.mmap.write(view_bytes(view, i, i + COPY_SIZE))
+            block.mmap.close()
+    except:
+        for meta in metas:
+            os.unlink(meta[0])
+        raise
+    finally:
+        for v in devices:
+            v.close()
+    return metas
+
+
+def _map_block(meta):
+    name, size, dtype, shape = meta
+    block = SharedBlock(size, name)
+    # the mapping stays valid, the memory is freed as soon as the last
+    # mapping is gone
+    block.unlink()
+    if size == 0:
+        # the block itself is one byte long, because an empty mapping is
+        # not possible
+        block.mmap.close()
+        if dtype is None:
+            return ''
+        return numpy.empty(shape, dtype=dtype)
+    if dtype is None:
+        return block.mmap
+    data = numpy.frombuffer(block.mmap, dtype=dtype,
+            count=size // numpy.dtype(dtype).itemsize)
+    return data.reshape(shape)
+
+
+def acquire_sharded(tasks, processes=None, group=group_by_host, **kwargs):
+    """Run acquisitions on several devices in parallel worker processes.
+
+    `tasks` is a list of (host, acquire) or (host, acquire, link_kwargs)
+    tuples. acquire(v) is called in a worker process with an opened Vxi11
+    object and returns the decoded samples, either as NumPy array or as any
+    object supporting the buffer interface. Thus, CPU heavy decoding runs on
+    all cores. acquire has to be picklable, eg. a module level function.
+
+    link_kwargs are passed to Vxi11() together with the additional keyword
+    arguments, eg. dict(name='gpib0,5'). Tasks with the same host and
+    link_kwargs share one link. group(host, link_kwargs) returns the key
+    of the worker a link is assigned to. By default, all links to one host
+    are handled by the same worker, one after another. Use group_by_link
+    to give every link its own worker.
+
+    The samples are passed back through shared memory blocks. Returns a
+    list of the results in the order of `tasks`, either NumPy arrays with
+    the same dtype and shape as returned by acquire or mmap objects.
+    """
+    jobs = _make_jobs(tasks, group, kwargs)
+
+    if processes is None:
+        processes = min(len(jobs), multiprocessing.cpu_count())
+    log.info('Acquiring from %d groups with %d processes', len(jobs),
+            processes)
+
+    pool = multiprocessing.Pool(max(processes, 1))
+    try:
+        pending = [pool.apply_async(_acquire_group, (job[:2],))
+                for job in jobs]
+        metas = list()
+        error = None
+        for p in pending:
+            try:
+                metas.append(p.get())
+            except Exception, e:
+                log.error('Acquisition failed: %s', e)
+                metas.append([])
+                if error is None:
+                    error = e
+    finally:
+        pool.close()
+        pool.join()
+
+    # don't leak the blocks of the successful groups
+    if error is not None:
+        for group_metas in metas:
+            for meta in group_metas:
+                os.unlink(meta[0])
+        raise error
+
+    results = [None] * len(tasks)
+    for (job, group_metas) in zip(jobs, metas):
+        for (n, meta) in zip(job[2], group_metas):
+            results[n] = _map_block(meta)
+    return results
@@ -269,21 +269,62 @@ class RpcClient(object):
         return self.make_call(0, None, None, None)
 
 
+class TransportOptions(object):
+    """Socket options used by RawTCPClient.
+
+    nodelay disables Nagle's algorithm, which otherwise delays small
+    request/response round trips. rcvbuf and sndbuf set the socket buffer
+    sizes in bytes, keepalive enables TCP keepalive probes. connect_timeout
+    and io_timeout are socket timeouts in seconds. None leaves the
+    respective system default untouched.
+    """
+    def __init__(self, nodelay=True, rcvbuf=None, sndbuf=None,
+            keepalive=False, connect_timeout=None, io_timeout=None):
+        self.nodelay = nodelay
+        self.rcvbuf = rcvbuf
+        self.sndbuf = sndbuf
+        self.keepalive = keepalive
+        self.connect_timeout = connect_timeout
+        self.io_timeout = io_timeout
+
+    def apply(self, sock):
+        if self.nodelay:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if self.rcvbuf is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.rcvbuf)
+        if self.sndbuf is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.sndbuf)
+        if self.keepalive:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+
+    def connect(self, host, port):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        # buffer sizes have to be set before connecting to take effect on
+        # the TCP window
+        self.apply(sock)
+        sock.settimeout(self.connect_timeout)
+        sock.connect((host, port))
+        sock.settimeout(self.io_timeout)
+        return sock
+
+
 class RawTCPClient(RpcClient):
-    def __init__(self, host, prog, vers, port):
+    def __init__(self, host, prog, vers, port, options=None):
         RpcClient.__init__(self, host, prog, vers, port)
+        if options is None:
+            options = TransportOptions()
+        self.options = options
         self.connect()
 
     def connect(self):
-        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.sock.connect((self.host, self.port))
+        self.sock = self.options.connect(self.host, self.port)
 
     def close(self):
         self.sock.close()
 
     def send_record(self, record):
         header = struct.pack('>I', len(record) | 0x80000000)
-        buf = header + record
+        buf = memoryview(header + record)
         n_sent = 0
         while n_sent < len(buf):
             n_sent += self.sock.send(buf[n_sent:])
@@ -308,6 +349,8 @@ class RawTCPClient(RpcClient):
         n_received = 0
         while n_received < length:
             b = self.sock.recv(length-n_received)
+            if len(b) == 0:
+                raise EOFError()
             n_received += len(b)
             buf.append(b)
 
@@ -352,6 +395,7 @@ class CommonPortMapperClient:
 
 
 class TCPPortMapperClient(CommonPortMapperClient, RawTCPClient):
-    def __init__(self, host, port=PMAP_PORT):
-        RawTCPClient.__init__(self, host, PMAP_PROG, PMAP_VERS, port)
+    def __init__(self, host, port=PMAP_PORT, options=None):
+        RawTCPClient.__init__(self, host, PMAP_PROG, PMAP_VERS, port,
+                options)
         CommonPortMapperClient.__init__(self)
@@ -14,9 +14,19 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import collections
 import logging
+import os
+import socket
+import sys
+import time
 import rpc
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 DEVICE_CORE_PROG = 0x0607af
 DEVICE_CORE_VERS = 1
 DEVICE_ASYNC_PROG = 0x0607b0
@@ -52,14 +62,145 @@ OP_FLAG_WAIT_BLOCK = 1
 OP_FLAG_END = 8
 OP_FLAG_TERMCHAR_SET = 128
 
+# default port of raw SCPI sockets
+SCPI_PORT = 5025
+
 REASON_REQCNT = 1
 REASON_CHR = 2
 REASON_END = 4
 
+# upper boundary for the request size of adaptive reads
+MAX_READ_SIZE = 1024*1024
+
+# Additional time in seconds the socket waits for a reply after the device
+# side io timeout has expired, if the socket timeout is set per call.
+SOCKET_TIMEOUT_MARGIN = 0.1
+
 def chunks(d, n):
     for i in xrange(0, len(d), n):
         yield d[i:i+n]
 
+def binblock_header(size):
+    """Return the IEEE 488.2 definite length block header for `size`
+    bytes of data."""
+    length = str(size)
+    return '#%d%s' % (len(length), length)
+
+def byte_view(data):
+    """Return a view of the raw bytes of `data` without copying them.
+
+    `data` may be a NumPy array or any object supporting either the new or
+    the old buffer interface.
+    """
+    if numpy is not None and isinstance(data, numpy.ndarray):
+        data = numpy.ascontiguousarray(data).reshape(-1).view(numpy.uint8)
+    try:
+        view = memoryview(data)
+    except TypeError:
+        # objects which only support the old buffer interface, eg.
+        # array.array
+        return buffer(data)
+    if view.itemsize != 1 or view.ndim != 1:
+        # memoryviews of python 2 can't be cast to bytes
+        view = memoryview(view.tobytes())
+    return view
+
+def block_chunks(prefix, size, read, n):
+    """Yield `prefix` followed by `size` bytes of data in chunks of at most
+    `n` bytes.
+
+    read(count) returns the next `count` bytes of the data. The end of the
+    prefix is sent together with the start of the data.
+    """
+    while len(prefix) >= n:
+        yield prefix[:n]
+        prefix = prefix[n:]
+    remaining = size
+    count = min(n - len(prefix), remaining)
+    data = prefix
+    while True:
+        if count > 0:
+            data += read(count)
+            remaining -= count
+        if len(data) == 0:
+            break
+        yield data
+        data = ''
+        count = min(n, remaining)
+
+def split_values(data, sep):
+    """Split `data` into values the way numpy.fromstring() does.
+
+    Whitespace around the values is ignored, a separator consisting of
+    whitespace only matches any run of whitespace. A trailing separator
+    is allowed.
+    """
+    sep = sep.strip()
+    if len(sep) == 0:
+        return data.split()
+    values = [v.strip() for v in data.split(sep)]
+    if values[-1] == '':
+        values.pop()
+    return values
+
+def view_bytes(view, start, end):
+    # The XDR packer needs strings, thus only the slices are copied. Slices
+    # of old style buffers already are strings.
+    data = view[start:end]
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    return data
+
+def unwrap_binblock(data_chunks):
+    """Strip a leading definite length block header from a stream of data
+    chunks.
+
+    If the data starts with a definite length block, only its payload is
+    yielded and everything after it, eg. the terminating newline, is
+    dropped. Otherwise the data is passed through unchanged.
+    """
+    head = ''
+    data_chunks = iter(data_chunks)
+    # collect enough data to decide whether there is a block header
+    for data in data_chunks:
+        head += data
+        if len(head) < 2:
+            continue
+        ndigits = head[1]
+        if head[0] != '#' or not '1' <= ndigits <= '9':
+            break
+        if len(head) >= 2 + int(ndigits):
+            break
+    else:
+        # the stream ended before the header was complete
+        if len(head) > 0:
+            yield head
+        return
+
+    ndigits = head[1:2]
+    if head[0] == '#' and '1' <= ndigits <= '9':
+        digits = head[2:2+int(ndigits)]
+    else:
+        digits = ''
+    if not digits.isdigit():
+        yield head
+        for data in data_chunks:
+            yield data
+        return
+
+    remaining = int(digits)
+    data = head[2+len(digits):]
+    while True:
+        if remaining > 0 and len(data) > 0:
+            yield data[:remaining]
+            remaining -= min(len(data), remaining)
+        try:
+            data = next(data_chunks)
+        except StopIteration:
+            break
+    if remaining > 0:
+        raise EOFError('block ended %d bytes early' % remaining)
+
 log = logging.getLogger(__name__)
 
 class Vxi11Packer(rpc.RpcPacker):
@@ -118,17 +259,17 @@ class Vxi11Unpacker(rpc.RpcUnpacker):
 
 
 class Vxi11Client(rpc.RawTCPClient):
-    def __init__(self, host):
+    def __init__(self, host, options=None):
         self.packer = Vxi11Packer()
         self.unpacker = Vxi11Unpacker('')
-        pmap = rpc.TCPPortMapperClient(host)
+        pmap = rpc.TCPPortMapperClient(host, options=options)
         mapping = (DEVICE_CORE_PROG, DEVICE_CORE_VERS, rpc.IPPROTO_TCP, 0)
         port = pmap.get_port(mapping)
         pmap.close()
         log.debug('VXI-11 uses port %d', port)
 
         rpc.RawTCPClient.__init__(self, host, DEVICE_CORE_PROG,
-                DEVICE_CORE_VERS, port)
+                DEVICE_CORE_VERS, port, options)
 
     def create_link(self, id, lock_device, lock_timeout, name):
         params = (id, lock_device, lock_timeout, name)
@@ -156,16 +297,188 @@ class Vxi11Client(rpc.RawTCPClient):
                 self.unpacker.unpack_device_error)
 
 
+class RawSocketClient(object):
+    """Raw SCPI socket client with the same interface as Vxi11Client.
+
+    Messages are terminated by a newline. Responses are split at the
+    termination character, except within definite length blocks, so binary
+    data may contain any byte. Timeouts are handled by the socket and
+    reported as ERR_IO_TIMEOUT, just like a VXI-11 device would do.
+    """
+    def __init__(self, host, port=SCPI_PORT, options=None):
+        if options is None:
+            options = rpc.TransportOptions()
+        self.host = host
+        self.port = port
+        self.sock = options.connect(host, port)
+        log.debug('Raw socket connected to port %d', port)
+
+        self._buf = bytearray()
+        self._pos = 0       # end of the scanned part of _buf
+        self._skip = 0      # remaining bytes of the current block
+        self._elem_start = True     # at the start of a response element
+
+    def close(self):
+        self.sock.close()
+
+    def _settimeout(self, io_timeout):
+        # a timeout of zero would turn the socket into non-blocking mode
+        self.sock.settimeout(max(io_timeout, 1) / 1000.0)
+
+    def _scan(self, term, limit):
+        # Returns the reason if the end of the message or the termination
+        # character was found, 0 otherwise. Stops at limit or at the end of
+        # the buffer.
+        buf = self._buf
+        end = min(len(buf), limit)
+        while self._pos < end:
+            if self._skip > 0:
+                n = min(self._skip, end - self._pos)
+                self._pos += n
+                self._skip -= n
+                continue
+            c = buf[self._pos]
+            # blocks can only start at the beginning of a response element
+            if c == ord('#') and self._elem_start:
+                if self._pos + 2 > len(buf):
+                    return 0
+                ndigits = buf[self._pos+1] - ord('0')
+                if 1 <= ndigits <= 9:
+                    start = self._pos + 2
+                    if start + ndigits > len(buf):
+                        return 0
+                    digits = str(buf[start:start+ndigits])
+                    if digits.isdigit():
+                        # the header is consumed as a whole, even if this
+                        # exceeds the limit
+                        self._skip = int(digits)
+                        self._pos = start + ndigits
+                        self._elem_start = False
+                        continue
+            self._pos += 1
+            self._elem_start = c in (ord(','), ord(';'), ord('\n'))
+            reason = 0
+            if c == term:
+                reason |= REASON_CHR
+            if c == ord('\n'):
+                reason |= REASON_END
+            if reason:
+                return reason
+        return 0
+
+    def create_link(self, id, lock_device, lock_timeout, name):
+        return ERR_NO_ERROR, 0, 0, 16*1024
+
+    def device_write(self, link, io_timeout, lock_timeout, flags, data):
+        self._settimeout(io_timeout)
+        size = len(data)
+        # the message terminator is sent with the last chunk, unless the
+        # message already ends with it
+        if flags & OP_FLAG_END and not data.endswith('\n'):
+            data += '\n'
+        try:
+            self.sock.sendall(data)
+        except socket.timeout:
+            return ERR_IO_TIMEOUT, 0
+        return ERR_NO_ERROR, size
+
+    def device_read(self, link, request_size, io_timeout, lock_timeout, flags,
+            term_char):
+        if flags & OP_FLAG_TERMCHAR_SET:
+            term = term_char
+        else:
+            term = None
+        self._settimeout(io_timeout)
+        while True:
+            reason = self._scan(term, request_size)
+            if reason or self._pos >= request_size:
+                data = str(self._buf[:self._pos])
+                del self._buf[:self._pos]
+                self._pos = 0
+                if reason:
+                    return ERR_NO_ERROR, reason, data
+                return ERR_NO_ERROR, REASON_REQCNT, data
+            try:
+                b = self.sock.recv(64*1024)
+            except socket.timeout:
+                return ERR_IO_TIMEOUT, 0, ''
+            if len(b) == 0:
+                raise EOFError()
+            self._buf.extend(b)
+
+    def destroy_link(self, link):
+        return ERR_NO_ERROR
+
+
 class Vxi11Error(Exception):
     pass
 
 
+class LatencyEstimator(object):
+    """Learns the latency distribution of a link from its recent calls.
+
+    The suggested timeout is the 95th percentile of the last `window` call
+    durations times `factor`, but at least `min_timeout` seconds.
+    """
+    def __init__(self, window=64, factor=4.0, min_timeout=0.01,
+            min_samples=8):
+        self.samples = collections.deque(maxlen=window)
+        self.factor = factor
+        self.min_timeout = min_timeout
+        self.min_samples = min_samples
+
+    def add(self, duration):
+        self.samples.append(duration)
+
+    def reset(self):
+        self.samples.clear()
+
+    def quantile(self, q):
+        samples = sorted(self.samples)
+        if len(samples) == 0:
+            return None
+        return samples[min(int(q * len(samples)), len(samples) - 1)]
+
+    @property
+    def timeout(self):
+        """Suggested io timeout in seconds, None until enough calls were
+        seen."""
+        if len(self.samples) < self.min_samples:
+            return None
+        return max(self.quantile(0.95) * self.factor, self.min_timeout)
+
+
 class Vxi11:
-    def __init__(self, host, name=None, client_id=None):
+    def __init__(self, host, name=None, client_id=None, options=None,
+            reconnect=False, transport='vxi11', port=None):
         self.host = host
+        # Either 'vxi11' or 'raw'. The port is only used by the raw
+        # transport, VXI-11 asks the portmapper.
+        self.transport = transport
+        self.port = port
         self.io_timeout = 2
         self.lock_timeout = 2
-        self.vxi11_client = Vxi11Client(host)
+        # If set, read() stops at this character, eg. '\n'
+        self.term_char = None
+        # If set, the io timeout of calls without an explicit timeout is
+        # taken from the latency learned from previous calls, but is never
+        # longer than io_timeout.
+        self.adaptive_timeout = False
+        self.latency = LatencyEstimator()
+        self.options = options
+        # If set, a broken connection is reestablished (including the
+        # portmapper lookup and the link). The call which noticed the lost
+        # connection still fails, nothing is ever sent again on the new
+        # link, because the device may already have executed it.
+        # A socket timeout always reestablishes the connection, regardless
+        # of this flag, since a late reply would be taken as the reply to
+        # the next call. In both cases the new link has a different link
+        # id and the device releases the locks held by the old one.
+        self.reconnect = reconnect
+        # set if the connection is in an unknown state and has to be
+        # reestablished before the next call
+        self._broken = False
+        self.vxi11_client = self._make_client()
         self.client_id = client_id
         if name is None:
             self.name = 'inst0'
@@ -174,7 +487,9 @@ class Vxi11:
 
     def open(self):
         log.info('Opening connection to %s', self.host)
+        self._create_link()
 
+    def _create_link(self):
         # If no client id was given, get it from the Vxi11 object
         client_id = self.client_id
         if client_id is None:
@@ -197,48 +512,374 @@ class Vxi11:
 
     def close(self):
         log.info('Close connection to %s', self.host)
-        self.vxi11_client.destroy_link(self.link_id)
+        if not self._broken:
+            self.vxi11_client.destroy_link(self.link_id)
         self.vxi11_client.close()
 
-    def write(self, message):
-        log.debug('Writing %d bytes (%s)', len(message), message)
-        io_timeout = self.io_timeout * 1000       # in ms
-        lock_timeout = self.lock_timeout * 1000   # in ms
-        flags = 0
-        # split into chunks
-        msg_chunks = list(chunks(message, self.max_recv_size))
-        for (n,chunk) in enumerate(msg_chunks):
-            if n == len(msg_chunks)-1:
-                flags = OP_FLAG_END
+    def _make_client(self):
+        if self.transport == 'vxi11':
+            return Vxi11Client(self.host, self.options)
+        elif self.transport == 'raw':
+            port = self.port
+            if port is None:
+                port = SCPI_PORT
+            return RawSocketClient(self.host, port, self.options)
+        raise ValueError('unknown transport %r' % self.transport)
+
+    def _reconnect(self):
+        log.info('Reconnecting to %s', self.host)
+        try:
+            self.vxi11_client.close()
+        except socket.error:
+            pass
+        self.vxi11_client = self._make_client()
+        self._create_link()
+        self._broken = False
+
+    def _call(self, name, *args):
+        if self._broken:
+            self._reconnect()
+        # The link id is looked up on every call, because it changes when
+        # the link is reestablished.
+        try:
+            return getattr(self.vxi11_client, name)(self.link_id, *args)
+        except socket.timeout:
+            # A late reply would be taken as the reply to the next call and
+            # the timeout may even have hit within a record. Thus, the
+            # connection can't be used anymore.
+            log.warning('Socket timeout on %s, reestablishing the link',
+                    self.host)
+            self._broken = True
+            self._try_reconnect()
+            raise Vxi11Error(ERR_IO_TIMEOUT)
+        except (socket.error, EOFError), e:
+            if not self.reconnect:
+                raise
+            # The call is never retried, the new link neither has the
+            # previous chunks of a message nor a pending response.
+            exc_info = sys.exc_info()
+            log.warning('Connection to %s lost (%s)', self.host, e)
+            self._broken = True
+            self._try_reconnect()
+            raise exc_info[0], exc_info[1], exc_info[2]
+
+    def _try_reconnect(self):
+        # If this fails, the link stays broken and the next call tries
+        # again.
+        try:
+            self._reconnect()
+        except Exception, e:
+            log.warning('Reconnecting to %s failed (%s)', self.host, e)
+
+    def _timeouts(self, io_timeout=None, deadline=None):
+        # An explicit io_timeout is used for long running operations, thus
+        # it is neither adapted nor shortened.
+        adapted = False
+        if io_timeout is None:
+            io_timeout = self.io_timeout
+            if self.adaptive_timeout and self.latency.timeout is not None:
+                io_timeout = min(io_timeout, self.latency.timeout)
+                adapted = True
+        if deadline is not None:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise Vxi11Error(ERR_IO_TIMEOUT)
+            io_timeout = min(io_timeout, remaining)
+            adapted = True
+
+        # A lost reply would block until the socket times out. Thus, the
+        # socket timeout follows a shortened io timeout.
+        if isinstance(self.vxi11_client, Vxi11Client):
+            if adapted:
+                sock_timeout = io_timeout + SOCKET_TIMEOUT_MARGIN
             else:
-                flags = 0
-            error, size = self.vxi11_client.device_write(self.link_id,
-                    io_timeout, lock_timeout, flags, chunk)
-            if error != ERR_NO_ERROR:
-                raise Vxi11Error(error)
-            assert size == len(chunk)
-
-    def ask(self, message):
-        self.write(message)
-        return self.read()
-
-    def read(self):
+                sock_timeout = self.vxi11_client.options.io_timeout
+            self.vxi11_client.sock.settimeout(sock_timeout)
+
+        io_timeout = int(io_timeout * 1000)            # in ms
+        lock_timeout = int(self.lock_timeout * 1000)   # in ms
+        return io_timeout, lock_timeout
+
+    def _write_chunks(self, msg_chunks, io_timeout=None, sent=None,
+            deadline=None):
+        # Hold back one chunk, so we know which one is the last and has to
+        # carry the END flag.
+        pending = None
+        for chunk in msg_chunks:
+            if pending is not None:
+                self._device_write(pending, 0, io_timeout, deadline, sent)
+            pending = chunk
+        if pending is not None:
+            self._device_write(pending, OP_FLAG_END, io_timeout, deadline,
+                    sent)
+
+    def _device_write(self, chunk, flags, io_timeout, deadline, sent=None):
+        io_timeout_ms, lock_timeout_ms = self._timeouts(io_timeout, deadline)
+        start = time.time()
+        error, size = self._call('device_write', io_timeout_ms,
+                lock_timeout_ms, flags, chunk)
+        if io_timeout is None:
+            self.latency.add(time.time() - start)
+        if error != ERR_NO_ERROR:
+            raise Vxi11Error(error)
+        assert size == len(chunk)
+        if sent is not None:
+            sent(size)
+
+    def _read_chunks(self, io_timeout=None, adaptive=False, term_char=None,
+            deadline=None):
         read_size = self.max_recv_size
-        io_timeout = self.io_timeout * 1000       # in ms
-        lock_timeout = self.lock_timeout * 1000   # in ms
         reason = 0
-        flags = 0
-        term_char = 0
-        data_list = list()
+        if term_char is None:
+            flags = 0
+            term_char = 0
+        else:
+            flags = OP_FLAG_TERMCHAR_SET
+            term_char = ord(term_char)
         while reason == 0:
-            error, reason, data = self.vxi11_client.device_read(self.link_id,
-                    read_size, io_timeout, lock_timeout, flags, term_char)
+            io_timeout_ms, lock_timeout_ms = self._timeouts(io_timeout,
+                    deadline)
+            start = time.time()
+            error, reason, data = self._call('device_read', read_size,
+                    io_timeout_ms, lock_timeout_ms, flags, term_char)
+            if io_timeout is None:
+                self.latency.add(time.time() - start)
             if error != ERR_NO_ERROR:
                 raise Vxi11Error(error)
-            data_list.append(data)
             log.debug('Received %d bytes', len(data))
 
+            # If the device filled the whole request, it has more data
+            # ready than we asked for. Ask for more next time.
+            if adaptive and len(data) >= read_size:
+                read_size = min(read_size * 2, MAX_READ_SIZE)
+
             if reason & REASON_REQCNT:
                 reason &= ~REASON_REQCNT
 
-        return ''.join(data_list)
+            yield data
+
+    def _full_timeout(self, io_timeout):
+        # Bulk transfers and *OPC? are long running operations. They always
+        # get the full timeout and are not used to learn the latency.
+        if io_timeout is None:
+            return self.io_timeout
+        return io_timeout
+
+    def _call_timeout(self, deadline, long_running):
+        # returns the io timeout and the absolute deadline of a call
+        if deadline is not None:
+            deadline += time.time()
+        if long_running:
+            return self.io_timeout, deadline
+        return None, deadline
+
+    def _write(self, message, io_timeout=None, deadline=None):
+        log.debug('Writing %d bytes (%s)', len(message), message)
+        # split into chunks
+        self._write_chunks(chunks(message, self.max_recv_size), io_timeout,
+                deadline=deadline)
+
+    def write(self, message, deadline=None, long_running=False):
+        io_timeout, deadline = self._call_timeout(deadline, long_running)
+        self._write(message, io_timeout, deadline)
+
+    def write_binblock(self, header, data, dtype=None, io_timeout=None):
+        """Write `header` followed by `data` as a definite length block.
+
+        `data` may be a NumPy array or any object supporting the buffer
+        interface, eg. a string, bytearray, memoryview or array.array. If
+        `dtype` is given, `data` is converted with NumPy first, eg.
+        dtype='<i2' for little endian 16 bit integers. The block header is
+        appended to `header` as is, eg. 'CURVE '.
+
+        The payload is sent in chunks of max_recv_size straight out of the
+        buffer, it is never concatenated with the header as a whole.
+        """
+        io_timeout = self._full_timeout(io_timeout)
+        if dtype is not None:
+            if numpy is None:
+                raise ImportError('dtype conversion requires numpy')
+            data = numpy.ascontiguousarray(data, dtype=dtype)
+        view = byte_view(data)
+        prefix = header + binblock_header(len(view))
+        log.debug('Writing block of %d bytes (%s)', len(view), header)
+
+        pos = [0]
+
+        def read(n):
+            data = view_bytes(view, pos[0], pos[0] + n)
+            pos[0] += n
+            return data
+
+        self._write_chunks(block_chunks(prefix, len(view), read,
+                self.max_recv_size), io_timeout)
+
+    def ask(self, message, deadline=None, long_running=False):
+        """Send `message` and return the response.
+
+        `deadline` is the time in seconds the whole transaction may take.
+        Operations flagged as `long_running` always use the full io_timeout,
+        even if adaptive_timeout is set, and are not used to learn the
+        latency of the link.
+        """
+        io_timeout, deadline = self._call_timeout(deadline, long_running)
+        self._write(message, io_timeout, deadline)
+        return ''.join(self._read_chunks(io_timeout,
+                term_char=self.term_char, deadline=deadline))
+
+    def read(self, deadline=None, long_running=False):
+        io_timeout, deadline = self._call_timeout(deadline, long_running)
+        return ''.join(self._read_chunks(io_timeout,
+                term_char=self.term_char, deadline=deadline))
+
+    def ask_values(self, query, sep=',', dtype=float, deadline=None,
+            long_running=False):
+        """Send `query` and parse the response as a list of numbers.
+
+        If NumPy is available, the response is parsed in one pass and a
+        NumPy array of type `dtype` is returned. Otherwise, a list is
+        returned and `dtype` has to be callable, eg. float or int. Raises
+        ValueError if any of the values can't be parsed.
+        """
+        data = self.ask(query, deadline, long_running).strip()
+        tokens = split_values(data, sep)
+        if numpy is not None:
+            values = numpy.fromstring(data, dtype=dtype, sep=sep)
+        else:
+            values = map(dtype, tokens)
+        # fromstring() silently stops at the first invalid value
+        if len(values) != len(tokens):
+            raise ValueError('could only parse %d of %d values' %
+                    (len(values), len(tokens)))
+        return values
+
+    def wait_complete(self, io_timeout=None):
+        """Block until all pending operations of the device are finished.
+
+        `*OPC?` only returns after the device has completed all pending
+        operations, thus the io_timeout has to be long enough for them. It
+        defaults to the full io_timeout, even if adaptive_timeout is set.
+        """
+        io_timeout = self._full_timeout(io_timeout)
+        self._write('*OPC?', io_timeout)
+        return int(''.join(self._read_chunks(io_timeout)).strip())
+
+    def fetch_file(self, command, f, progress=None, io_timeout=None):
+        """Send `command` and stream the response to the file object `f`.
+
+        The response is written to `f` chunk by chunk as it arrives, it is
+        never held in memory as a whole. If the response is a definite
+        length block, only its payload is written. The request size is
+        doubled as long as the device fills it completely. If `progress` is
+        given, it is called with the number of bytes written so far and the
+        elapsed time after each chunk.
+
+        Returns a `TransferStats` object.
+        """
+        io_timeout = self._full_timeout(io_timeout)
+        self._write(command, io_timeout)
+        stats = TransferStats()
+        data_chunks = self._read_chunks(io_timeout, adaptive=True)
+        for data in unwrap_binblock(data_chunks):
+            f.write(data)
+            stats.update(len(data))
+            if progress is not None:
+                progress(stats.nbytes, stats.elapsed)
+        log.info('Fetched %s', stats)
+        return stats
+
+    def send_file(self, command, f, size=None, progress=None,
+            io_timeout=None):
+        """Send the contents of the file object `f` as a definite length
+        block after `command`, eg. 'MMEM:DATA "setup.set",'.
+
+        If `size` is not given, `f` has to be seekable. Otherwise exactly
+        `size` bytes are read from `f`. The file is read in chunks of
+        max_recv_size, so it is never held in memory as a whole.
+
+        Returns a `TransferStats` object, which counts the payload bytes.
+        """
+        io_timeout = self._full_timeout(io_timeout)
+        if size is None:
+            pos = f.tell()
+            f.seek(0, os.SEEK_END)
+            size = f.tell() - pos
+            f.seek(pos)
+        header = command + binblock_header(size)
+        stats = TransferStats()
+
+        remaining = [size]
+
+        def read(n):
+            data = f.read(n)
+            if len(data) < n:
+                raise EOFError('file is %d bytes shorter than size'
+                        % (remaining[0] - len(data)))
+            remaining[0] -= n
+            return data
+
+        # only the payload is counted, like in fetch_file()
+        header_left = [len(header)]
+
+        def sent(nbytes):
+            n = min(nbytes, header_left[0])
+            header_left[0] -= n
+            stats.update(nbytes - n)
+            if progress is not None:
+                progress(stats.nbytes, stats.elapsed)
+
+        self._write_chunks(block_chunks(header, size, read,
+                self.max_recv_size), io_timeout, sent)
+        log.info('Sent %s', stats)
+        return stats
+
+
+class TransferStats(object):
+    def __init__(self):
+        self.nbytes = 0
+        self.start = time.time()
+        self.end = self.start
+
+    def update(self, nbytes):
+        self.nbytes += nbytes
+        self.end = time.time()
+
+    @property
+    def elapsed(self):
+        return self.end - self.start
+
+    @property
+    def rate(self):
+        """Throughput in bytes per second."""
+        if self.elapsed == 0:
+            return 0.0
+        return self.nbytes / self.elapsed
+
+    def __str__(self):
+        return '%d bytes in %.3f s (%.1f kB/s)' % (self.nbytes, self.elapsed,
+                self.rate / 1000)
+
+
+def compare_transports(host, workload, repeat=10, **kwargs):
+    """Run `workload(v)` `repeat` times over each transport to `host`.
+
+    Returns a dict mapping the transport name to the mean duration of a
+    workload run in seconds. Additional keyword arguments are passed to
+    Vxi11().
+    """
+    results = dict()
+    for transport in ('vxi11', 'raw'):
+        v = Vxi11(host, transport=transport, **kwargs)
+        v.open()
+        try:
+            start = time.time()
+            for i in xrange(repeat):
+                workload(v)
+            results[transport] = (time.time() - start) / repeat
+        finally:
+            v.close()
+    fastest = min(results, key=results.get)
+    log.info('%s is the faster transport for %s (%s)', fastest, host,
+            ', '.join('%s: %.3f ms' % (t, d * 1000)
+                for (t, d) in sorted(results.items())))
+    return results
@@ -53,6 +53,8 @@ def main():
             help='be more verbose')
     parser.add_option('-V', action='store_true', dest='version',
             help='show version')
+    parser.add_option('-s', type='int', dest='port', metavar='PORT',
+            help='use a raw SCPI socket on PORT instead of VXI-11')
     parser.add_option('--always-check-esr', action='store_true',
             dest='check_esr',
             help='Check the error status register after every command')
@@ -75,7 +77,10 @@ def main():
 
     host = args[0]
 
-    v = Vxi11(host)
+    if options.port is not None:
+        v = Vxi11(host, transport='raw', port=options.port)
+    else:
+        v = Vxi11(host)
     v.open()
 
     print "Enter command to send. Quit with 'q'."
@@ -0,0 +1,66 @@
+import errno
+import socket
+
+from pyvxi11 import rpc
+from pyvxi11.vxi11 import Vxi11, ERR_NO_ERROR
+
+
+class SocketPairOptions(rpc.TransportOptions):
+    def __init__(self, sock):
+        rpc.TransportOptions.__init__(self)
+        self.sock = sock
+
+    def connect(self, host, port):
+        return self.sock
+
+
+class FakeClient(object):
+    def __init__(self):
+        self.writes = list()
+        self.responses = list()
+        self.io_timeouts = list()
+        # raised by the next device_write() call, if set
+        self.write_error = None
+        self.closed = False
+
+    def _check_closed(self):
+        if self.closed:
+            raise socket.error(errno.EBADF, 'Bad file descriptor')
+
+    def create_link(self, id, lock_device, lock_timeout, name):
+        return ERR_NO_ERROR, 1, 0, 16
+
+    def device_write(self, link, io_timeout, lock_timeout, flags, data):
+        self._check_closed()
+        if self.write_error is not None:
+            error, self.write_error = self.write_error, None
+            raise error
+        self.io_timeouts.append(io_timeout)
+        self.writes.append((flags, data))
+        return ERR_NO_ERROR, len(data)
+
+    def device_read(self, link, request_size, io_timeout, lock_timeout, flags,
+            term_char):
+        self._check_closed()
+        self.io_timeouts.append(io_timeout)
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def destroy_link(self, link):
+        self._check_closed()
+        return ERR_NO_ERROR
+
+    def close(self):
+        self.closed = True
+
+
+class FakeVxi11(Vxi11):
+    # raised when a new client is created, if set
+    connect_error = None
+
+    def _make_client(self):
+        if self.connect_error is not None:
+            raise self.connect_error
+        return FakeClient()
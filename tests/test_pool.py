@@ -0,0 +1,142 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from pyvxi11 import pool
+from pyvxi11.pool import (SharedBlock, acquire_sharded, group_by_host,
+        group_by_link, _make_jobs, _map_block)
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class TestSharedBlock(unittest.TestCase):
+    def share(self, data, dtype=None, shape=None):
+        block = SharedBlock(len(data))
+        block.mmap.write(data)
+        block.mmap.close()
+        return _map_block((block.name, block.size, dtype, shape))
+
+    def test_bytes(self):
+        self.assertEqual(self.share('abc')[:], 'abc')
+
+    def test_empty(self):
+        self.assertEqual(self.share(''), '')
+
+    @unittest.skipIf(numpy is None, 'requires numpy')
+    def test_array(self):
+        a = numpy.arange(6, dtype='<i2').reshape(2, 3)
+        b = self.share(buffer(a), a.dtype.str, a.shape)
+        self.assertEqual(b.tolist(), a.tolist())
+
+    @unittest.skipIf(numpy is None, 'requires numpy')
+    def test_empty_array(self):
+        b = self.share('', '<f8', (0, 4))
+        self.assertEqual(b.shape, (0, 4))
+
+
+class FakeDevice(object):
+    # counts the links opened in the worker process
+    links = 0
+
+    def __init__(self, host, **kwargs):
+        FakeDevice.links += 1
+        self.link = FakeDevice.links
+        self.host = host
+        self.kwargs = kwargs
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+
+# acquire functions have to be picklable
+def acquire_id(v):
+    return '%s/%s/%d' % (v.host, v.kwargs.get('name'), v.link)
+
+def acquire_memoryview(v):
+    return memoryview(bytearray('abc'))
+
+def acquire_array(v):
+    return numpy.arange(6, dtype='<i4').reshape(3, 2)
+
+def acquire_fail(v):
+    raise RuntimeError('acquisition failed')
+
+
+class TestMakeJobs(unittest.TestCase):
+    tasks = [('a', 1), ('b', 2), ('a', 3, dict(name='gpib0,5')), ('a', 4)]
+
+    def test_group_by_host(self):
+        jobs = _make_jobs(self.tasks, group_by_host, dict(name='inst0'))
+        self.assertEqual(jobs, [
+            ([('a', dict(name='inst0')), ('a', dict(name='gpib0,5'))],
+                [(0, 1), (1, 3), (0, 4)], [0, 2, 3]),
+            ([('b', dict(name='inst0'))], [(0, 2)], [1]),
+        ])
+
+    def test_group_by_link(self):
+        jobs = _make_jobs(self.tasks, group_by_link, dict())
+        self.assertEqual(jobs, [
+            ([('a', dict())], [(0, 1), (0, 4)], [0, 3]),
+            ([('b', dict())], [(0, 2)], [1]),
+            ([('a', dict(name='gpib0,5'))], [(0, 3)], [2]),
+        ])
+
+
+class TestAcquireSharded(unittest.TestCase):
+    def setUp(self):
+        self.vxi11 = pool.Vxi11
+        self.shm_dir = pool.SHM_DIR
+        # the worker processes are forked and inherit the fake
+        pool.Vxi11 = FakeDevice
+        pool.SHM_DIR = tempfile.mkdtemp()
+
+    def tearDown(self):
+        # all blocks have to be unlinked
+        self.assertEqual(os.listdir(pool.SHM_DIR), [])
+        shutil.rmtree(pool.SHM_DIR)
+        pool.Vxi11 = self.vxi11
+        pool.SHM_DIR = self.shm_dir
+
+    def test_order_and_links(self):
+        tasks = [('a', acquire_id), ('b', acquire_id),
+                ('a', acquire_id, dict(name='gpib0,5')), ('a', acquire_id)]
+        results = acquire_sharded(tasks, processes=1, name='inst0')
+        results = [r[:] for r in results]
+        self.assertEqual([r.rsplit('/', 1)[0] for r in results],
+                ['a/inst0', 'b/inst0', 'a/gpib0,5', 'a/inst0'])
+        links = [r.rsplit('/', 1)[1] for r in results]
+        # tasks with the same host and link_kwargs share one link
+        self.assertEqual(links[0], links[3])
+        self.assertEqual(len(set(links)), 3)
+
+    def test_group_by_link(self):
+        tasks = [('a', acquire_id), ('a', acquire_id, dict(name='x'))]
+        results = acquire_sharded(tasks, processes=1, group=group_by_link)
+        self.assertEqual([r[:].rsplit('/', 1)[0] for r in results],
+                ['a/None', 'a/x'])
+
+    def test_memoryview(self):
+        results = acquire_sharded([('a', acquire_memoryview)], processes=1)
+        self.assertEqual(results[0][:], 'abc')
+
+    @unittest.skipIf(numpy is None, 'requires numpy')
+    def test_array(self):
+        results = acquire_sharded([('a', acquire_array)], processes=1)
+        self.assertEqual(results[0].tolist(), acquire_array(None).tolist())
+
+    def test_failed_group(self):
+        # the blocks of the successful group are unlinked, too
+        tasks = [('a', acquire_id), ('b', acquire_fail)]
+        self.assertRaises(RuntimeError, acquire_sharded, tasks, processes=1)
+
+    def test_failed_step(self):
+        # the blocks of earlier steps in the same group are unlinked
+        tasks = [('a', acquire_id), ('a', acquire_fail)]
+        self.assertRaises(RuntimeError, acquire_sharded, tasks, processes=1)
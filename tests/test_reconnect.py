@@ -0,0 +1,124 @@
+import errno
+import socket
+import unittest
+
+from fakes import FakeVxi11
+from pyvxi11 import rpc
+from pyvxi11.vxi11 import Vxi11, ERR_NO_ERROR, OP_FLAG_END, REASON_END
+
+
+class TestTransportOptions(unittest.TestCase):
+    def setUp(self):
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.bind(('127.0.0.1', 0))
+        self.server.listen(1)
+        self.port = self.server.getsockname()[1]
+
+    def tearDown(self):
+        self.server.close()
+
+    def test_defaults(self):
+        sock = rpc.TransportOptions().connect('127.0.0.1', self.port)
+        try:
+            self.assertTrue(sock.getsockopt(socket.IPPROTO_TCP,
+                    socket.TCP_NODELAY))
+            self.assertFalse(sock.getsockopt(socket.SOL_SOCKET,
+                    socket.SO_KEEPALIVE))
+            self.assertEqual(sock.gettimeout(), None)
+        finally:
+            sock.close()
+
+    def test_options(self):
+        options = rpc.TransportOptions(nodelay=False, rcvbuf=65536,
+                sndbuf=65536, keepalive=True, connect_timeout=5,
+                io_timeout=1.5)
+        sock = options.connect('127.0.0.1', self.port)
+        try:
+            self.assertFalse(sock.getsockopt(socket.IPPROTO_TCP,
+                    socket.TCP_NODELAY))
+            self.assertTrue(sock.getsockopt(socket.SOL_SOCKET,
+                    socket.SO_KEEPALIVE))
+            # the kernel may round the buffer sizes up
+            self.assertTrue(sock.getsockopt(socket.SOL_SOCKET,
+                    socket.SO_RCVBUF) >= 65536)
+            self.assertTrue(sock.getsockopt(socket.SOL_SOCKET,
+                    socket.SO_SNDBUF) >= 65536)
+            self.assertEqual(sock.gettimeout(), 1.5)
+        finally:
+            sock.close()
+
+    def test_raw_transport(self):
+        options = rpc.TransportOptions(io_timeout=1)
+        v = Vxi11('127.0.0.1', options=options, transport='raw',
+                port=self.port)
+        v.open()
+        try:
+            self.assertEqual(v.vxi11_client.sock.gettimeout(), 1)
+        finally:
+            v.close()
+
+
+class TestReconnect(unittest.TestCase):
+    def setUp(self):
+        self.v = FakeVxi11('localhost', reconnect=True)
+        self.v.open()
+        self.client = self.v.vxi11_client
+
+    def lost(self):
+        return socket.error(errno.ECONNRESET, 'Connection reset by peer')
+
+    def test_write_not_sent_again(self):
+        self.client.write_error = self.lost()
+        self.assertRaises(socket.error, self.v.write, 'INIT')
+        self.assertTrue(self.client.closed)
+        self.assertTrue(self.v.vxi11_client is not self.client)
+        self.assertEqual(self.v.vxi11_client.writes, [])
+        self.assertFalse(self.v._broken)
+
+    def test_ask_not_sent_again(self):
+        self.client.responses.append(EOFError())
+        self.assertRaises(EOFError, self.v.ask, 'INIT;*OPC?')
+        self.assertEqual(self.client.writes, [(OP_FLAG_END, 'INIT;*OPC?')])
+        self.assertEqual(self.v.vxi11_client.writes, [])
+
+    def test_new_link_is_used(self):
+        self.client.write_error = self.lost()
+        self.assertRaises(socket.error, self.v.write, '*RST')
+        self.v.write('*CLS')
+        self.assertEqual(self.v.vxi11_client.writes, [(OP_FLAG_END, '*CLS')])
+
+    def test_reconnect_failed(self):
+        error = self.lost()
+        self.client.write_error = error
+        self.v.connect_error = socket.error(errno.ECONNREFUSED,
+                'Connection refused')
+        try:
+            self.v.write('*RST')
+        except socket.error, e:
+            # the original error is raised, not the one of the reconnect
+            self.assertTrue(e is error)
+        else:
+            self.fail('no socket.error raised')
+        self.assertTrue(self.v._broken)
+        # the next call tries again
+        self.assertRaises(socket.error, self.v.write, '*CLS')
+        self.v.connect_error = None
+        self.v.write('*CLS')
+        self.assertFalse(self.v._broken)
+        self.assertEqual(self.v.vxi11_client.writes, [(OP_FLAG_END, '*CLS')])
+
+    def test_close_after_failed_reconnect(self):
+        self.client.write_error = self.lost()
+        self.v.connect_error = socket.error(errno.ECONNREFUSED,
+                'Connection refused')
+        self.assertRaises(socket.error, self.v.write, '*RST')
+        # the link is not destroyed on the closed client
+        self.v.close()
+
+    def test_no_reconnect(self):
+        self.v.reconnect = False
+        self.client.responses.append(EOFError())
+        self.assertRaises(EOFError, self.v.ask, '*IDN?')
+        self.assertTrue(self.v.vxi11_client is self.client)
+        self.client.responses.append((ERR_NO_ERROR, REASON_END, '1\n'))
+        self.assertEqual(self.v.ask('*IDN?'), '1\n')
@@ -0,0 +1,106 @@
+import socket
+import StringIO
+import unittest
+
+from fakes import FakeVxi11
+from pyvxi11.vxi11 import (Vxi11Error, LatencyEstimator, ERR_NO_ERROR,
+        ERR_IO_TIMEOUT, REASON_END)
+
+
+class TestTimeouts(unittest.TestCase):
+    def setUp(self):
+        self.v = FakeVxi11('localhost')
+        self.v.open()
+        self.v.adaptive_timeout = True
+        for i in range(self.v.latency.min_samples):
+            self.v.latency.add(0.001)
+
+    def test_adaptive(self):
+        client = self.v.vxi11_client
+        client.responses.append((ERR_NO_ERROR, REASON_END, '1\n'))
+        self.v.ask('*IDN?')
+        self.assertEqual(client.io_timeouts, [10, 10])
+
+    def test_long_running(self):
+        client = self.v.vxi11_client
+        client.responses.append((ERR_NO_ERROR, REASON_END, '1\n'))
+        n = len(self.v.latency.samples)
+        self.v.ask('*TST?', long_running=True)
+        self.assertEqual(client.io_timeouts, [2000, 2000])
+        self.assertEqual(len(self.v.latency.samples), n)
+
+    def test_bulk_transfers_are_long_running(self):
+        client = self.v.vxi11_client
+        n = len(self.v.latency.samples)
+        client.responses.append((ERR_NO_ERROR, REASON_END, '1\n'))
+        self.v.wait_complete()
+        client.responses.append((ERR_NO_ERROR, REASON_END, '#13abc\n'))
+        f = StringIO.StringIO()
+        self.v.fetch_file('MMEM:DATA? "a"', f)
+        self.assertEqual(f.getvalue(), 'abc')
+        self.v.send_file('MMEM:DATA "a",', StringIO.StringIO('abc'))
+        self.v.write_binblock('CURVE ', 'abc')
+        self.assertEqual(set(client.io_timeouts), set([2000]))
+        self.assertEqual(len(self.v.latency.samples), n)
+
+    def test_deadline_passed(self):
+        self.assertRaises(Vxi11Error, self.v.ask, '*IDN?', deadline=-1)
+
+    def test_socket_timeout(self):
+        client = self.v.vxi11_client
+        client.responses.append(socket.timeout())
+        try:
+            self.v.ask('*IDN?')
+        except Vxi11Error, e:
+            self.assertEqual(e.args, (ERR_IO_TIMEOUT,))
+        else:
+            self.fail('no Vxi11Error raised')
+        # the broken connection was replaced
+        self.assertTrue(client.closed)
+        self.assertTrue(self.v.vxi11_client is not client)
+
+    def test_socket_timeout_without_reconnect(self):
+        # the link is reestablished even if reconnect isn't set
+        self.v.reconnect = False
+        client = self.v.vxi11_client
+        client.responses.append(socket.timeout())
+        self.assertRaises(Vxi11Error, self.v.ask, '*IDN?')
+        self.assertTrue(self.v.vxi11_client is not client)
+        self.assertFalse(self.v._broken)
+
+
+class TestLatencyEstimator(unittest.TestCase):
+    def test_not_enough_samples(self):
+        e = LatencyEstimator(min_samples=4)
+        for i in range(3):
+            e.add(0.1)
+        self.assertEqual(e.timeout, None)
+        e.add(0.1)
+        self.assertAlmostEqual(e.timeout, 0.4)
+
+    def test_quantile(self):
+        e = LatencyEstimator(window=100)
+        for i in range(100):
+            e.add(i / 1000.0)
+        self.assertAlmostEqual(e.quantile(0.95), 0.095)
+        self.assertAlmostEqual(e.timeout, 0.38)
+
+    def test_min_timeout(self):
+        e = LatencyEstimator(min_timeout=0.05)
+        for i in range(10):
+            e.add(0.001)
+        self.assertEqual(e.timeout, 0.05)
+
+    def test_window(self):
+        e = LatencyEstimator(window=8, min_samples=8)
+        for i in range(8):
+            e.add(1.0)
+        for i in range(8):
+            e.add(0.01)
+        self.assertAlmostEqual(e.timeout, 0.04)
+
+    def test_reset(self):
+        e = LatencyEstimator(min_samples=1)
+        e.add(0.1)
+        e.reset()
+        self.assertEqual(e.timeout, None)
@@ -0,0 +1,79 @@
+import StringIO
+import unittest
+
+from fakes import FakeVxi11
+from pyvxi11.vxi11 import unwrap_binblock, ERR_NO_ERROR, REASON_END
+
+
+class TestUnwrapBinblock(unittest.TestCase):
+    def unwrap(self, *data_chunks):
+        return ''.join(unwrap_binblock(data_chunks))
+
+    def test_block(self):
+        self.assertEqual(self.unwrap('#15abcde\n'), 'abcde')
+
+    def test_header_split(self):
+        self.assertEqual(self.unwrap('#', '2', '0', '5ab', 'cde'), 'abcde')
+
+    def test_trailing_bytes_dropped(self):
+        self.assertEqual(self.unwrap('#13ab', 'c\n', 'xyz'), 'abc')
+
+    def test_indefinite_block(self):
+        self.assertEqual(self.unwrap('#0ab', 'c\n'), '#0abc\n')
+
+    def test_no_block(self):
+        self.assertEqual(self.unwrap('1.5', ',2\n'), '1.5,2\n')
+        self.assertEqual(self.unwrap('#', 'H1F\n'), '#H1F\n')
+        self.assertEqual(self.unwrap('#2x\n'), '#2x\n')
+        self.assertEqual(self.unwrap('#'), '#')
+        self.assertEqual(self.unwrap(), '')
+
+    def test_block_ended_early(self):
+        self.assertRaises(EOFError, self.unwrap, '#15ab', 'c')
+        self.assertRaises(EOFError, self.unwrap, '#210abc')
+
+
+class TestFetchFile(unittest.TestCase):
+    def setUp(self):
+        self.v = FakeVxi11('localhost')
+        self.v.open()
+
+    def test_payload_only(self):
+        self.v.vxi11_client.responses.append(
+                (ERR_NO_ERROR, REASON_END, '#15abcde\n'))
+        f = StringIO.StringIO()
+        stats = self.v.fetch_file('DATA?', f)
+        self.assertEqual(f.getvalue(), 'abcde')
+        self.assertEqual(stats.nbytes, 5)
+
+
+class TestSendFile(unittest.TestCase):
+    def setUp(self):
+        self.v = FakeVxi11('localhost')
+        self.v.open()
+        self.writes = self.v.vxi11_client.writes
+
+    def sent(self):
+        return ''.join(data for (flags, data) in self.writes)
+
+    def test_send(self):
+        progress = list()
+        stats = self.v.send_file('DATA ', StringIO.StringIO('x' * 20),
+                progress=lambda n, elapsed: progress.append(n))
+        self.assertEqual(self.sent(), 'DATA #220' + 'x' * 20)
+        self.assertEqual(stats.nbytes, 20)
+        self.assertEqual(progress[-1], 20)
+
+    def test_size_too_small(self):
+        f = StringIO.StringIO('abcdef')
+        stats = self.v.send_file('DATA ', f, size=4)
+        self.assertEqual(self.sent(), 'DATA #14abcd')
+        self.assertEqual(stats.nbytes, 4)
+        # the rest of the file is left untouched
+        self.assertEqual(f.read(), 'ef')
+
+    def test_size_too_large(self):
+        f = StringIO.StringIO('abc')
+        self.assertRaises(EOFError, self.v.send_file, 'DATA ', f, size=5)
+        # the block is never completed
+        self.assertFalse(any(flags for (flags, data) in self.writes))
@@ -0,0 +1,64 @@
+import unittest
+
+from fakes import FakeVxi11
+from pyvxi11 import vxi11
+from pyvxi11.vxi11 import split_values, ERR_NO_ERROR, REASON_END
+
+
+class TestAskValues(unittest.TestCase):
+    def setUp(self):
+        self.v = FakeVxi11('localhost')
+        self.v.open()
+        self.responses = self.v.vxi11_client.responses
+
+    def test_values(self):
+        self.responses.append((ERR_NO_ERROR, REASON_END, '1,2.5,-3e-3\n'))
+        self.assertEqual(list(self.v.ask_values('CURV?')), [1, 2.5, -3e-3])
+
+    def test_separator(self):
+        self.responses.append((ERR_NO_ERROR, REASON_END, '1;2\n'))
+        self.assertEqual(list(self.v.ask_values('CURV?', sep=';')), [1, 2])
+
+    def test_empty(self):
+        self.responses.append((ERR_NO_ERROR, REASON_END, '\n'))
+        self.assertEqual(list(self.v.ask_values('CURV?')), [])
+
+    def test_invalid(self):
+        self.responses.append((ERR_NO_ERROR, REASON_END, '1,2,ERR\n'))
+        self.assertRaises(ValueError, self.v.ask_values, 'CURV?')
+
+    def test_space_separator(self):
+        self.responses.append((ERR_NO_ERROR, REASON_END, '1  2\t3\n'))
+        self.assertEqual(list(self.v.ask_values('CURV?', sep=' ')),
+                [1, 2, 3])
+
+    def test_trailing_separator(self):
+        self.responses.append((ERR_NO_ERROR, REASON_END, '1,2,\n'))
+        self.assertEqual(list(self.v.ask_values('CURV?')), [1, 2])
+
+    def test_spaces_around_separator(self):
+        self.responses.append((ERR_NO_ERROR, REASON_END, '1, 2 ,3\n'))
+        self.assertEqual(list(self.v.ask_values('CURV?')), [1, 2, 3])
+
+    def test_empty_value(self):
+        self.responses.append((ERR_NO_ERROR, REASON_END, '1,,2\n'))
+        self.assertRaises(ValueError, self.v.ask_values, 'CURV?')
+
+
+class TestSplitValues(unittest.TestCase):
+    def test_split(self):
+        self.assertEqual(split_values('1,2', ','), ['1', '2'])
+        self.assertEqual(split_values('1 , 2,', ', '), ['1', '2'])
+        self.assertEqual(split_values('1 \n 2', ' '), ['1', '2'])
+        self.assertEqual(split_values('', ','), [])
+        self.assertEqual(split_values('', ' '), [])
+
+
+class TestAskValuesWithoutNumpy(TestAskValues):
+    def setUp(self):
+        TestAskValues.setUp(self)
+        self.numpy = vxi11.numpy
+        vxi11.numpy = None
+
+    def tearDown(self):
+        vxi11.numpy = self.numpy
@@ -0,0 +1,105 @@
+import socket
+import unittest
+
+from fakes import SocketPairOptions
+from pyvxi11.vxi11 import (RawSocketClient, ERR_NO_ERROR, OP_FLAG_END,
+        OP_FLAG_TERMCHAR_SET, REASON_REQCNT, REASON_CHR, REASON_END)
+
+
+class RecordingSocket(object):
+    def __init__(self, sock, sent):
+        self.sock = sock
+        self.sent = sent
+
+    def sendall(self, data):
+        self.sent.append(data)
+        self.sock.sendall(data)
+
+    def __getattr__(self, name):
+        return getattr(self.sock, name)
+
+
+class TestRawSocketClient(unittest.TestCase):
+    def setUp(self):
+        self.peer, sock = socket.socketpair()
+        self.client = RawSocketClient('localhost', 0, SocketPairOptions(sock))
+
+    def tearDown(self):
+        self.client.close()
+        self.peer.close()
+
+    def read(self, request_size=1024, flags=0, term_char=0):
+        return self.client.device_read(0, request_size, 1000, 1000, flags,
+                term_char)
+
+    def test_message(self):
+        self.peer.sendall('1.0,2.0\n3\n')
+        self.assertEqual(self.read(), (ERR_NO_ERROR, REASON_END, '1.0,2.0\n'))
+        self.assertEqual(self.read(), (ERR_NO_ERROR, REASON_END, '3\n'))
+
+    def test_block_with_newline(self):
+        self.peer.sendall('#15a\nb\nc\n')
+        self.assertEqual(self.read(),
+                (ERR_NO_ERROR, REASON_END, '#15a\nb\nc\n'))
+
+    def test_block_after_header(self):
+        self.peer.sendall('1,#12\n\n;#13\n\n\n\n')
+        self.assertEqual(self.read(),
+                (ERR_NO_ERROR, REASON_END, '1,#12\n\n;#13\n\n\n\n'))
+
+    def test_block_split(self):
+        self.peer.sendall('#2')
+        self.peer.sendall('03\n\n\n\n')
+        self.assertEqual(self.read(),
+                (ERR_NO_ERROR, REASON_END, '#203\n\n\n\n'))
+
+    def test_hash_in_text(self):
+        self.peer.sendall('Probe #1 ok\nChannel #12\n')
+        self.assertEqual(self.read(),
+                (ERR_NO_ERROR, REASON_END, 'Probe #1 ok\n'))
+        self.assertEqual(self.read(),
+                (ERR_NO_ERROR, REASON_END, 'Channel #12\n'))
+
+    def test_hash_without_length(self):
+        self.peer.sendall('#H1F\n#2x\n')
+        self.assertEqual(self.read(), (ERR_NO_ERROR, REASON_END, '#H1F\n'))
+        self.assertEqual(self.read(), (ERR_NO_ERROR, REASON_END, '#2x\n'))
+
+    def test_term_char(self):
+        self.peer.sendall('a;b\n')
+        r = self.read(flags=OP_FLAG_TERMCHAR_SET, term_char=ord(';'))
+        self.assertEqual(r, (ERR_NO_ERROR, REASON_CHR, 'a;'))
+        r = self.read(flags=OP_FLAG_TERMCHAR_SET, term_char=ord(';'))
+        self.assertEqual(r, (ERR_NO_ERROR, REASON_END, 'b\n'))
+
+    def test_request_size(self):
+        self.peer.sendall('abcdefg\n')
+        self.assertEqual(self.read(3), (ERR_NO_ERROR, REASON_REQCNT, 'abc'))
+        self.assertEqual(self.read(3), (ERR_NO_ERROR, REASON_REQCNT, 'def'))
+        self.assertEqual(self.read(3), (ERR_NO_ERROR, REASON_END, 'g\n'))
+
+    def test_request_size_within_block(self):
+        self.peer.sendall('#16\n\n\n\n\n\n\n')
+        self.assertEqual(self.read(4), (ERR_NO_ERROR, REASON_REQCNT, '#16\n'))
+        self.assertEqual(self.read(4),
+                (ERR_NO_ERROR, REASON_REQCNT, '\n\n\n\n'))
+        self.assertEqual(self.read(4), (ERR_NO_ERROR, REASON_END, '\n\n'))
+
+    def test_write(self):
+        self.assertEqual(self.client.device_write(0, 1000, 1000, 0, 'AB'),
+                (ERR_NO_ERROR, 2))
+        self.assertEqual(
+                self.client.device_write(0, 1000, 1000, OP_FLAG_END, 'C'),
+                (ERR_NO_ERROR, 1))
+        self.assertEqual(self.peer.recv(16), 'ABC\n')
+
+    def test_write_terminated(self):
+        self.client.device_write(0, 1000, 1000, OP_FLAG_END, '*RST\n')
+        self.client.device_write(0, 1000, 1000, OP_FLAG_END, '*CLS')
+        self.assertEqual(self.peer.recv(16), '*RST\n*CLS\n')
+
+    def test_write_single_send(self):
+        sent = list()
+        self.client.sock = RecordingSocket(self.client.sock, sent)
+        self.client.device_write(0, 1000, 1000, OP_FLAG_END, '*RST')
+        self.assertEqual(sent, ['*RST\n'])
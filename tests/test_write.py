@@ -0,0 +1,70 @@
+import StringIO
+import unittest
+
+from fakes import FakeVxi11
+from pyvxi11.vxi11 import block_chunks, OP_FLAG_END
+
+
+class TestWrite(unittest.TestCase):
+    def setUp(self):
+        self.v = FakeVxi11('localhost')
+        self.v.open()
+        self.writes = self.v.vxi11_client.writes
+
+    def test_single_chunk(self):
+        self.v.write('*RST')
+        self.assertEqual(self.writes, [(OP_FLAG_END, '*RST')])
+
+    def test_end_flag_on_last_chunk(self):
+        self.v.write('x' * 40)
+        self.assertEqual([flags for (flags, data) in self.writes],
+                [0, 0, OP_FLAG_END])
+        self.assertEqual(''.join(data for (flags, data) in self.writes),
+                'x' * 40)
+
+    def test_exact_multiple(self):
+        self.v.write('x' * 32)
+        self.assertEqual([flags for (flags, data) in self.writes],
+                [0, OP_FLAG_END])
+
+    def test_binblock(self):
+        self.v.write_binblock('CURVE ', bytearray('abcdefghijklmnopqrst'))
+        self.assertEqual(self.writes[0], (0, 'CURVE #220abcdef'))
+        self.assertEqual([flags for (flags, data) in self.writes],
+                [0, OP_FLAG_END])
+        self.assertEqual(''.join(data for (flags, data) in self.writes),
+                'CURVE #220abcdefghijklmnopqrst')
+
+    def test_binblock_long_header(self):
+        header = 'MMEM:DATA "%s",' % ('x' * 30)
+        self.v.write_binblock(header, 'abc')
+        for (flags, data) in self.writes:
+            self.assertTrue(len(data) <= 16)
+        self.assertEqual(''.join(data for (flags, data) in self.writes),
+                header + '#13abc')
+        self.assertEqual(self.writes[-1][0], OP_FLAG_END)
+
+    def test_send_file_long_header(self):
+        header = 'MMEM:DATA "%s",' % ('x' * 30)
+        self.v.send_file(header, StringIO.StringIO('abc'))
+        for (flags, data) in self.writes:
+            self.assertTrue(len(data) <= 16)
+        self.assertEqual(''.join(data for (flags, data) in self.writes),
+                header + '#13abc')
+
+
+class TestBlockChunks(unittest.TestCase):
+    def chunks(self, prefix, data, n):
+        f = StringIO.StringIO(data)
+        return list(block_chunks(prefix, len(data), f.read, n))
+
+    def test_short_prefix(self):
+        self.assertEqual(self.chunks('#15', 'abcde', 4), ['#15a', 'bcde'])
+
+    def test_long_prefix(self):
+        self.assertEqual(self.chunks('CMD #15', 'abcde', 3),
+                ['CMD', ' #1', '5ab', 'cde'])
+
+    def test_prefix_fills_chunk(self):
+        self.assertEqual(self.chunks('#13', 'abc', 3), ['#13', 'abc'])
+        self.assertEqual(self.chunks('#10', '', 3), ['#10'])